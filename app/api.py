@@ -3,8 +3,12 @@ FastAPI REST API for Heart Disease Prediction Model
 """
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from typing import List, Dict, Any
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import itertools
 import joblib
 import pandas as pd
 import numpy as np
@@ -12,9 +16,15 @@ from pathlib import Path
 import logging
 import uvicorn
 
+from app.responses import ORJSONResponse
+from src.models.inference import build_fast_predictor, build_onnx_predictor
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("heart-disease-api")
+# Per-prediction log lines are sampled: only every LOG_EVERY-th one is emitted
+LOG_EVERY = 100
+prediction_counter = itertools.count()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -22,7 +32,8 @@ app = FastAPI(
     description="API for predicting heart disease risk using machine learning",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -34,37 +45,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Expected features
-FEATURES = [
+# Compress larger responses (batch predictions repeat the same message text)
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=4)
+
+# Expected features (column order of the model input matrix)
+FEATURES = (
     "age", "sex", "cp", "trestbps", "chol", "fbs", "restecg", "thalach",
     "exang", "oldpeak", "slope", "ca", "thal"
-]
+)
+NUM_FEATURES = len(FEATURES)
 
 # Model path
 MODEL_PATH = Path("models/model_pipeline.pkl")
+ONNX_PATH = Path("models/model.onnx")
 
 # Global variable to store the model
 model = None
+# Fused NumPy scorer for linear pipelines (None -> use model.predict_proba)
+fast_predict = None
+# onnxruntime session for the exported pipeline (None -> no models/model.onnx,
+# unloadable, or exported from a different pickle)
+onnx_predict = None
+
+# Risk level bands: < 0.3 Low, < 0.7 Medium, otherwise High
+RISK_LEVELS = ("Low", "Medium", "High")
+RISK_THRESHOLDS = np.array([0.3, 0.7])
+# Message templates (printf-style, fed probability * 100), indexed by
+# prediction * len(RISK_LEVELS) + risk code; shared by get_message and get_messages
+MESSAGE_TEMPLATES = tuple(
+    ["Low risk of heart disease detected (Probability: %.2f%%). Continue maintaining a healthy lifestyle."] * len(RISK_LEVELS)
+    + [f"{risk} risk of heart disease detected (Probability: %.2f%%). Consider consulting a healthcare professional." for risk in RISK_LEVELS]
+)
+
+# Dynamic batching: concurrent /predict requests are queued and scored
+# together with a single predict_proba call.
+MAX_BATCH_SIZE = 32
+BATCH_WAIT_S = 0.005
+# Batches are scored off the event loop on a single thread, which also keeps
+# BLAS calls from contending with each other
+INFERENCE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+batch_queue: Optional[asyncio.Queue] = None
+batch_worker_task: Optional[asyncio.Task] = None
 
 
 class HeartDiseaseInput(BaseModel):
     """Input schema for heart disease prediction"""
-    age: int = Field(..., ge=1, le=150, description="Age in years")
-    sex: int = Field(..., ge=0, le=1, description="Sex (0 = Female, 1 = Male)")
-    cp: int = Field(..., ge=0, le=3, description="Chest pain type (0-3)")
-    trestbps: int = Field(..., ge=80, le=200, description="Resting blood pressure (mmHg)")
-    chol: int = Field(..., ge=100, le=600, description="Serum cholesterol (mg/dl)")
-    fbs: int = Field(..., ge=0, le=1, description="Fasting blood sugar > 120 mg/dl (0 = No, 1 = Yes)")
-    restecg: int = Field(..., ge=0, le=2, description="Resting ECG results (0-2)")
-    thalach: int = Field(..., ge=60, le=220, description="Maximum heart rate achieved")
-    exang: int = Field(..., ge=0, le=1, description="Exercise induced angina (0 = No, 1 = Yes)")
-    oldpeak: float = Field(..., ge=0.0, le=10.0, description="ST depression induced by exercise")
-    slope: int = Field(..., ge=0, le=2, description="Slope of peak exercise ST segment (0-2)")
-    ca: int = Field(..., ge=0, le=4, description="Number of major vessels colored by fluoroscopy (0-4)")
-    thal: int = Field(..., ge=0, le=3, description="Thalassemia (0 = Normal, 1 = Fixed defect, 2 = Reversible defect, 3 = Unknown)")
-
-    class Config:
-        schema_extra = {
+    age: Annotated[int, Field(ge=1, le=150, description="Age in years")]
+    sex: Annotated[int, Field(ge=0, le=1, description="Sex (0 = Female, 1 = Male)")]
+    cp: Annotated[int, Field(ge=0, le=3, description="Chest pain type (0-3)")]
+    trestbps: Annotated[int, Field(ge=80, le=200, description="Resting blood pressure (mmHg)")]
+    chol: Annotated[int, Field(ge=100, le=600, description="Serum cholesterol (mg/dl)")]
+    fbs: Annotated[int, Field(ge=0, le=1, description="Fasting blood sugar > 120 mg/dl (0 = No, 1 = Yes)")]
+    restecg: Annotated[int, Field(ge=0, le=2, description="Resting ECG results (0-2)")]
+    thalach: Annotated[int, Field(ge=60, le=220, description="Maximum heart rate achieved")]
+    exang: Annotated[int, Field(ge=0, le=1, description="Exercise induced angina (0 = No, 1 = Yes)")]
+    oldpeak: Annotated[float, Field(ge=0.0, le=10.0, description="ST depression induced by exercise")]
+    slope: Annotated[int, Field(ge=0, le=2, description="Slope of peak exercise ST segment (0-2)")]
+    ca: Annotated[int, Field(ge=0, le=4, description="Number of major vessels colored by fluoroscopy (0-4)")]
+    thal: Annotated[int, Field(ge=0, le=3, description="Thalassemia (0 = Normal, 1 = Fixed defect, 2 = Reversible defect, 3 = Unknown)")]
+
+    model_config = ConfigDict(
+        extra="forbid",
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "age": 63,
                 "sex": 1,
@@ -81,6 +124,15 @@ class HeartDiseaseInput(BaseModel):
                 "thal": 1
             }
         }
+    )
+
+    @property
+    def as_row(self) -> np.ndarray:
+        """Features as a (1, NUM_FEATURES) float row in FEATURES order"""
+        values = self.__dict__
+        return np.fromiter(
+            (values[f] for f in FEATURES), dtype=np.float64, count=NUM_FEATURES
+        ).reshape(1, NUM_FEATURES)
 
 
 class HeartDiseaseOutput(BaseModel):
@@ -105,20 +157,96 @@ class HealthResponse(BaseModel):
 
 def load_model():
     """Load the trained model pipeline"""
-    global model
+    global model, fast_predict, onnx_predict
     try:
         if not MODEL_PATH.exists():
             logger.error(f"Model file not found at {MODEL_PATH}")
             return None
         
-        model = joblib.load(MODEL_PATH)
-        logger.info(f"Model loaded successfully from {MODEL_PATH}")
+        # mmap_mode shares the pickled numpy arrays through the page cache
+        model = joblib.load(MODEL_PATH, mmap_mode="r")
+        fast_predict = build_fast_predictor(model)
+        onnx_predict = build_onnx_predictor(ONNX_PATH, MODEL_PATH)
+        logger.info(
+            f"Model loaded successfully from {MODEL_PATH} "
+            f"(fused scorer: {fast_predict is not None}, onnx: {onnx_predict is not None})"
+        )
         return model
     except Exception as e:
         logger.error(f"Error loading model: {str(e)}")
         return None
 
 
+def to_model_input(X: np.ndarray):
+    """Adapt a feature matrix to what the loaded pipeline expects.
+
+    Pipelines trained on index-based columns take the ndarray as is; older
+    pickles fitted on named DataFrame columns still need a DataFrame.
+    """
+    if hasattr(model, "feature_names_in_"):
+        return pd.DataFrame(X, columns=FEATURES)
+    return X
+
+
+def score(X: np.ndarray) -> np.ndarray:
+    """Probability of heart disease for each row of a feature matrix"""
+    if fast_predict is not None:
+        return fast_predict(X)
+    if onnx_predict is not None:
+        return onnx_predict(X)
+    return model.predict_proba(to_model_input(X))[:, 1]
+
+
+def warm_up():
+    """Run one dummy prediction so the first request doesn't pay lazy-init costs"""
+    try:
+        score(np.zeros((1, NUM_FEATURES)))
+    except Exception as e:
+        logger.warning(f"Model warm-up failed: {str(e)}")
+
+
+async def batch_worker():
+    """Collect queued rows into batches and score each batch in one call"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await batch_queue.get()]
+        deadline = loop.time() + BATCH_WAIT_S
+        while len(batch) < MAX_BATCH_SIZE:
+            try:
+                batch.append(batch_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(batch_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        X = np.vstack([arr for arr, _ in batch])
+        try:
+            probabilities = await loop.run_in_executor(INFERENCE_POOL, score, X)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+        for (_, fut), prob in zip(batch, probabilities):
+            if not fut.done():
+                fut.set_result(float(prob))
+
+
+async def predict_probability(arr: np.ndarray) -> float:
+    """Score a single (1, n_features) row, via the batch worker when running"""
+    if batch_queue is None:
+        return float(score(arr)[0])
+    fut = asyncio.get_running_loop().create_future()
+    await batch_queue.put((arr, fut))
+    return await fut
+
+
 def get_risk_level(probability: float) -> str:
     """Determine risk level based on probability"""
     if probability < 0.3:
@@ -129,22 +257,46 @@ def get_risk_level(probability: float) -> str:
         return "High"
 
 
-def get_message(prediction: int, probability: float) -> str:
+def classify_risk(probabilities: np.ndarray) -> np.ndarray:
+    """Vectorized get_risk_level: index into RISK_LEVELS for each probability"""
+    return np.searchsorted(RISK_THRESHOLDS, probabilities, side="right")
+
+
+def get_message(prediction: int, probability: float, risk_level: Optional[str] = None) -> str:
     """Generate interpretation message"""
-    if prediction == 0:
-        return f"Low risk of heart disease detected (Probability: {probability:.2%}). Continue maintaining a healthy lifestyle."
-    else:
-        risk = get_risk_level(probability)
-        return f"{risk} risk of heart disease detected (Probability: {probability:.2%}). Consider consulting a healthcare professional."
+    code = RISK_LEVELS.index(risk_level or get_risk_level(probability))
+    return MESSAGE_TEMPLATES[int(prediction) * len(RISK_LEVELS) + code] % (probability * 100.0)
+
+
+def get_messages(predictions: np.ndarray, probabilities: np.ndarray, risk_codes: np.ndarray) -> List[str]:
+    """Vectorized get_message: pick each row's template with array ops, then format once"""
+    codes = np.asarray(predictions, dtype=np.intp) * len(RISK_LEVELS) + risk_codes
+    percentages = np.asarray(probabilities, dtype=np.float64) * 100.0
+    return [MESSAGE_TEMPLATES[c] % pct for c, pct in zip(codes.tolist(), percentages.tolist())]
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup"""
+    global batch_queue, batch_worker_task
     logger.info("Starting Heart Disease Prediction API...")
     load_model()
     if model is None:
         logger.warning("⚠️ Model not loaded! Predictions will fail until model is available.")
+    else:
+        warm_up()
+    batch_queue = asyncio.Queue()
+    batch_worker_task = asyncio.create_task(batch_worker())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the batch worker"""
+    global batch_queue, batch_worker_task
+    if batch_worker_task is not None:
+        batch_worker_task.cancel()
+    batch_queue = None
+    batch_worker_task = None
 
 
 @app.get("/", tags=["Root"])
@@ -186,26 +338,27 @@ async def predict(input_data: HeartDiseaseInput):
         )
     
     try:
-        # Convert input to DataFrame
-        input_dict = input_data.dict()
-        df = pd.DataFrame([input_dict], columns=FEATURES)
+        # Convert input to a single-row feature matrix
+        arr = input_data.as_row
         
-        # Make prediction
-        prediction = model.predict(df)[0]
-        probability = model.predict_proba(df)[0][1]  # Probability of class 1 (disease)
+        # Make prediction (probability of class 1, i.e. disease)
+        probability = await predict_probability(arr)
+        prediction = int(probability >= 0.5)
         
         # Get risk level and message
         risk_level = get_risk_level(probability)
         message = get_message(prediction, probability)
         
-        logger.info(f"Prediction made: {prediction}, Probability: {probability:.4f}")
+        if next(prediction_counter) % LOG_EVERY == 0:
+            logger.info(f"Prediction made: {prediction}, Probability: {probability:.4f}")
         
-        return HeartDiseaseOutput(
-            prediction=int(prediction),
-            probability=float(probability),
-            risk_level=risk_level,
-            message=message
-        )
+        # Plain dict rendered by orjson; skips response-model validation
+        return ORJSONResponse({
+            "prediction": int(prediction),
+            "probability": float(probability),
+            "risk_level": risk_level,
+            "message": message
+        })
     
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
@@ -233,30 +386,35 @@ async def predict_batch(batch_input: BatchPredictionInput):
         )
     
     try:
-        # Convert inputs to DataFrame
-        inputs = [item.dict() for item in batch_input.instances]
-        df = pd.DataFrame(inputs, columns=FEATURES)
+        # Convert inputs to a feature matrix, filled one feature column at a time
+        values = [item.__dict__ for item in batch_input.instances]
+        n = len(values)
+        X = np.empty((n, NUM_FEATURES), dtype=np.float64)
+        for j, f in enumerate(FEATURES):
+            X[:, j] = np.fromiter((v[f] for v in values), dtype=np.float64, count=n)
         
-        # Make predictions
-        predictions = model.predict(df)
-        probabilities = model.predict_proba(df)[:, 1]
+        # Make predictions (class label derived from the probability; no second pass)
+        probabilities = await asyncio.get_running_loop().run_in_executor(INFERENCE_POOL, score, X)
+        predictions = (probabilities >= 0.5).astype(np.int8)
         
         # Prepare results
-        results = []
-        for pred, prob in zip(predictions, probabilities):
-            risk_level = get_risk_level(prob)
-            message = get_message(pred, prob)
-            
-            results.append({
-                "prediction": int(pred),
-                "probability": float(prob),
-                "risk_level": risk_level,
+        risk_codes = classify_risk(probabilities)
+        messages = get_messages(predictions, probabilities, risk_codes)
+        results = [
+            {
+                "prediction": pred,
+                "probability": prob,
+                "risk_level": RISK_LEVELS[code],
                 "message": message
-            })
+            }
+            for pred, prob, code, message in zip(
+                predictions.tolist(), probabilities.tolist(), risk_codes.tolist(), messages
+            )
+        ]
         
         logger.info(f"Batch prediction made for {len(results)} instances")
         
-        return {"predictions": results}
+        return ORJSONResponse({"predictions": results})
     
     except Exception as e:
         logger.error(f"Error during batch prediction: {str(e)}")
@@ -277,7 +435,7 @@ async def model_info():
     
     return {
         "model_type": str(type(model).__name__),
-        "features": FEATURES,
+        "features": list(FEATURES),
         "num_features": len(FEATURES),
         "model_path": str(MODEL_PATH)
     }
@@ -1,46 +1,77 @@
+import asyncio
+import itertools
+import os
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict
 
 import joblib
+import numpy as np
 import pandas as pd
 from fastapi import FastAPI
-from pydantic import BaseModel
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, ConfigDict
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+)
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
+from app.responses import ORJSONResponse
+from src.models.inference import build_fast_predictor, build_onnx_predictor
+
 # Logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("heart-api")
+# Per-prediction log lines are sampled (every LOG_EVERY-th); the probability
+# distribution is tracked by the PREDICTION_PROBABILITY histogram instead
+LOG_EVERY = 100
+prediction_counter = itertools.count()
 
 # Prometheus metrics
 REQUEST_COUNT = Counter("requests_total", "Total requests", ["endpoint"])
 REQUEST_LATENCY = Histogram("request_latency_seconds", "Request latency", ["endpoint"])
+PREDICTION_PROBABILITY = Histogram(
+    "prediction_probability", "Predicted probability of heart disease",
+    buckets=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+)
+CACHE_LOOKUPS = Counter("prediction_cache_lookups_total", "Prediction cache lookups")
+CACHE_MISSES = Counter("prediction_cache_misses_total", "Prediction cache misses")
 
-# Expected features
-FEATURES = [
+# Expected features (column order of the model input matrix)
+FEATURES = (
     "age","sex","cp","trestbps","chol","fbs","restecg","thalach",
     "exang","oldpeak","slope","ca","thal"
-]
+)
+NUM_FEATURES = len(FEATURES)
+# Prediction cache: inputs are keyed on the feature tuple. oldpeak, the only
+# float field, is rounded to the 1 decimal the dataset records it at (the
+# rounded value is also what gets scored)
+CACHE_SIZE = 8192
+OLDPEAK_IDX = FEATURES.index("oldpeak")
+# Inference runs off the event loop on one thread (serializes BLAS calls)
+INFERENCE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
 
 class HeartInput(BaseModel):
-    age: float
+    age: int
     sex: int
     cp: int
-    trestbps: float
-    chol: float
+    trestbps: int
+    chol: int
     fbs: int
     restecg: int
-    thalach: float
+    thalach: int
     exang: int
     oldpeak: float
     slope: int
-    ca: float
+    ca: int
     thal: int
 
-app = FastAPI(title="Heart Disease Risk API")
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+app = FastAPI(title="Heart Disease Risk API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware for Streamlit frontend
 app.add_middleware(
@@ -53,9 +84,43 @@ app.add_middleware(
 
 # Load model pipeline
 MODEL_PATH = Path("models/model_pipeline.pkl")
+ONNX_PATH = Path("models/model.onnx")
 if not MODEL_PATH.exists():
     logger.warning("Model not found at models/model_pipeline.pkl. Train first: python src/models/train.py --fast")
-PIPELINE = joblib.load(MODEL_PATH) if MODEL_PATH.exists() else None
+# mmap_mode shares the pickled numpy arrays through the page cache
+PIPELINE = joblib.load(MODEL_PATH, mmap_mode="r") if MODEL_PATH.exists() else None
+# Older pickles were fitted on named DataFrame columns and still need a DataFrame
+NEEDS_FRAME = hasattr(PIPELINE, "feature_names_in_")
+# Fused NumPy scorer for linear pipelines; None falls back to predict_proba
+PIPELINE_FAST = build_fast_predictor(PIPELINE) if PIPELINE is not None else None
+# onnxruntime session for the exported pipeline; None when models/model.onnx is
+# absent, unloadable or was exported from a different pickle
+PIPELINE_ONNX = build_onnx_predictor(ONNX_PATH, MODEL_PATH) if PIPELINE is not None else None
+
+
+def infer(data: np.ndarray) -> np.ndarray:
+    """Disease probability for each row of an (n, NUM_FEATURES) matrix"""
+    if PIPELINE_FAST is not None:
+        return PIPELINE_FAST(data)
+    if PIPELINE_ONNX is not None:
+        return PIPELINE_ONNX(data)
+    if NEEDS_FRAME:
+        data = pd.DataFrame(data, columns=FEATURES)
+    return PIPELINE.predict_proba(data)[:, 1]
+
+
+# LRU of feature tuple -> probability. Only touched from the event loop, so hits
+# are a plain dict lookup and never wait on INFERENCE_POOL
+PREDICTION_CACHE: "OrderedDict[tuple, float]" = OrderedDict()
+
+
+# Warm up with one dummy prediction so the first request doesn't pay lazy-init costs
+if PIPELINE is not None:
+    try:
+        infer(np.zeros((1, NUM_FEATURES)))
+    except Exception as e:
+        logger.warning(f"Model warm-up failed: {e}")
+
 
 @app.get("/health")
 def health():
@@ -63,21 +128,43 @@ def health():
     return {"status": "ok", "model_loaded": PIPELINE is not None}
 
 @app.post("/predict")
-def predict(input_data: HeartInput):
+async def predict(input_data: HeartInput):
     start = time.time()
     REQUEST_COUNT.labels(endpoint="/predict").inc()
 
     if PIPELINE is None:
         return {"error": "Model not loaded. Train and place models/model_pipeline.pkl."}
 
-    data = pd.DataFrame([{k: getattr(input_data, k) for k in FEATURES}])
-    proba = float(PIPELINE.predict_proba(data)[:, 1][0])
+    values = input_data.__dict__
+    row = [values[k] for k in FEATURES]
+    row[OLDPEAK_IDX] = round(row[OLDPEAK_IDX], 1)
+    key = tuple(row)
+    CACHE_LOOKUPS.inc()
+    proba = PREDICTION_CACHE.get(key)
+    if proba is None:
+        CACHE_MISSES.inc()
+        data = np.asarray(row, dtype=np.float64).reshape(1, NUM_FEATURES)
+        loop = asyncio.get_running_loop()
+        proba = float((await loop.run_in_executor(INFERENCE_POOL, infer, data))[0])
+        PREDICTION_CACHE[key] = proba
+        if len(PREDICTION_CACHE) > CACHE_SIZE:
+            PREDICTION_CACHE.popitem(last=False)
+    else:
+        PREDICTION_CACHE.move_to_end(key)
     pred = int(proba >= 0.5)
 
     REQUEST_LATENCY.labels(endpoint="/predict").observe(time.time() - start)
-    logger.info(f"Prediction made - Risk: {pred}, Probability: {proba}")
-    return {"prediction": pred, "probability": proba}
+    PREDICTION_PROBABILITY.observe(proba)
+    if next(prediction_counter) % LOG_EVERY == 0:
+        logger.info(f"Prediction made - Risk: {pred}, Probability: {proba}")
+    return ORJSONResponse({"prediction": pred, "probability": proba})
 
 @app.get("/metrics")
 def metrics():
+    # Under gunicorn (see gunicorn.conf.py) each worker writes its metrics to
+    # PROMETHEUS_MULTIPROC_DIR; aggregate them so /metrics covers all workers
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,16 @@
+"""
+Shared response classes for the Heart Disease Prediction APIs
+"""
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (Rust) instead of the stdlib encoder.
+
+    Endpoints on the hot path return this directly with plain dict content,
+    which skips FastAPI's response-model validation and jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for serving app.main with multiple uvicorn workers.
+
+The app (and model) is loaded once in the master with preload_app and
+shared copy-on-write with the forked workers; the model arrays are also
+memory-mapped, so workers share the same page-cache pages.
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Keep idle client connections open long enough to be reused between UI interactions
+keepalive = 75
+
+# Metrics from all workers are aggregated through files in this directory.
+# Reset it here: the config is read before the app is preloaded, which is
+# when the metrics are first created.
+PROMETHEUS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_DIR:
+    shutil.rmtree(PROMETHEUS_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if PROMETHEUS_DIR:
+        multiprocess.mark_process_dead(worker.pid)
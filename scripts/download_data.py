@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-import pandas as pd
+import pyarrow.csv as pacsv
+import requests
 
 UCI_URL = "https://archive.ics.uci.edu/ml/machine-learning-databases/heart-disease/processed.cleveland.data"
 HEADERS = [
@@ -15,7 +16,17 @@ def main():
     csv_path = data_dir / "heart.csv"
 
     print("Downloading UCI Cleveland dataset...")
-    df = pd.read_csv(UCI_URL, names=HEADERS, na_values="?", header=None)
+    # Stream the response body straight into pyarrow's multithreaded CSV parser
+    with requests.get(UCI_URL, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        table = pacsv.read_csv(
+            response.raw,
+            read_options=pacsv.ReadOptions(column_names=HEADERS),
+            parse_options=pacsv.ParseOptions(delimiter=","),
+            convert_options=pacsv.ConvertOptions(null_values=["?"], strings_can_be_null=True),
+        )
+    df = table.to_pandas()
     # Convert multiclass target (num 0-4) to binary: 0 -> 0 (no disease), 1-4 -> 1 (disease)
     df["target"] = (df["num"] > 0).astype(int)
     df.drop(columns=["num"], inplace=True)
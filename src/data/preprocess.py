@@ -13,6 +13,11 @@ FEATURES = [
 NUMERIC_FEATURES = ["age", "trestbps", "chol", "thalach", "oldpeak"]
 CATEGORICAL_FEATURES = ["sex", "cp", "fbs", "restecg", "exang", "slope", "ca", "thal"]
 
+# Column positions within FEATURES; selecting by index lets the fitted
+# preprocessor accept raw ndarrays at inference time (no DataFrame needed).
+NUMERIC_IDX = [FEATURES.index(f) for f in NUMERIC_FEATURES]
+CATEGORICAL_IDX = [FEATURES.index(f) for f in CATEGORICAL_FEATURES]
+
 
 def get_preprocessor() -> ColumnTransformer:
     numeric_transformer = Pipeline(steps=[
@@ -27,8 +32,8 @@ def get_preprocessor() -> ColumnTransformer:
 
     preprocessor = ColumnTransformer(
         transformers=[
-            ("num", numeric_transformer, NUMERIC_FEATURES),
-            ("cat", categorical_transformer, CATEGORICAL_FEATURES),
+            ("num", numeric_transformer, NUMERIC_IDX),
+            ("cat", categorical_transformer, CATEGORICAL_IDX),
         ]
     )
     return preprocessor
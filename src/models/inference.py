@@ -0,0 +1,159 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from scipy.special import expit
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.data.preprocess import FEATURES
+
+logger = logging.getLogger(__name__)
+
+# ONNX metadata_props key holding the SHA-256 of the pickle the graph was exported from
+PIPELINE_DIGEST_KEY = "pipeline_sha256"
+
+
+def pipeline_digest(path: Path) -> str:
+    """SHA-256 hex digest of a saved pipeline file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _column_indices(cols) -> Optional[List[int]]:
+    indices = []
+    for c in cols:
+        if isinstance(c, str):
+            if c not in FEATURES:
+                return None
+            indices.append(FEATURES.index(c))
+        elif isinstance(c, (int, np.integer)):
+            indices.append(int(c))
+        else:
+            return None
+    return indices
+
+
+def build_fast_predictor(pipeline) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """Fuse a fitted preprocessor + LogisticRegression pipeline into NumPy ops.
+
+    Imputation, scaling, one-hot encoding and the linear model are folded into
+    flat arrays once, so scoring is a gather, one comparison and two dot
+    products. The returned function maps an (n, len(FEATURES)) float matrix to
+    P(disease). Returns None for pipelines this kernel does not cover (e.g. a
+    RandomForest); callers should keep using ``predict_proba`` then.
+    """
+    if not isinstance(pipeline, Pipeline) or "preprocessor" not in pipeline.named_steps:
+        return None
+    clf = pipeline.steps[-1][1]
+    if not isinstance(clf, LogisticRegression) or clf.coef_.shape[0] != 1:
+        return None
+
+    coef = clf.coef_[0]
+    bias = float(clf.intercept_[0])
+    fill = np.full(len(FEATURES), np.nan)
+    num_idx, num_w = [], []
+    cat_idx, cat_vals, cat_w = [], [], []
+    offset = 0
+
+    for name, trans, cols in pipeline.named_steps["preprocessor"].transformers_:
+        if trans == "drop":
+            continue
+        idx = _column_indices(cols)
+        if idx is None or not isinstance(trans, Pipeline):
+            return None
+
+        mean = np.zeros(len(idx))
+        scale = np.ones(len(idx))
+        onehot = None
+        for _, step in trans.steps:
+            if onehot is not None:
+                return None  # nothing is supported after the encoder
+            if isinstance(step, SimpleImputer) and not step.add_indicator:
+                fill[idx] = step.statistics_
+            elif isinstance(step, StandardScaler):
+                if step.mean_ is not None:
+                    mean = step.mean_
+                if step.scale_ is not None:
+                    scale = step.scale_
+            elif (isinstance(step, OneHotEncoder) and step.drop is None
+                  and step.handle_unknown == "ignore"):
+                onehot = step
+            else:
+                return None
+
+        if onehot is None:
+            # Fold the scaler into the weights: w * (x - m) / s = (w / s) * x - w * m / s
+            w = coef[offset:offset + len(idx)] / scale
+            num_idx.extend(idx)
+            num_w.extend(w)
+            bias -= float(np.dot(w, mean))
+            offset += len(idx)
+        else:
+            if not np.all(mean == 0) or not np.all(scale == 1):
+                return None
+            for col, cats in zip(idx, onehot.categories_):
+                cat_idx.extend([col] * len(cats))
+                cat_vals.extend(cats)
+                cat_w.extend(coef[offset:offset + len(cats)])
+                offset += len(cats)
+
+    if offset != coef.shape[0]:
+        return None
+
+    num_idx = np.asarray(num_idx, dtype=np.intp)
+    num_w = np.asarray(num_w, dtype=np.float64)
+    cat_idx = np.asarray(cat_idx, dtype=np.intp)
+    cat_vals = np.asarray(cat_vals, dtype=np.float64)
+    cat_w = np.asarray(cat_w, dtype=np.float64)
+    has_fill = not np.all(np.isnan(fill))
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURES))
+        if has_fill:
+            missing = np.isnan(X)
+            if missing.any():
+                X = np.where(missing, fill, X)
+        z = X[:, num_idx] @ num_w + (X[:, cat_idx] == cat_vals) @ cat_w + bias
+        return expit(z)
+
+    return predict
+
+
+def build_onnx_predictor(onnx_path: Path, pipeline_path: Path) -> Optional[Callable[[np.ndarray], np.ndarray]]:
+    """Load an exported pipeline (see train.save_best_model) into onnxruntime.
+
+    Returns a function mapping an (n, len(FEATURES)) matrix to P(disease), or
+    None when no ONNX file exists next to the pickle, it cannot be loaded
+    (corrupt file, unsupported opset) or it was exported from a different
+    pickle than ``pipeline_path`` (stale export).
+    """
+    if not Path(onnx_path).exists() or not Path(pipeline_path).exists():
+        return None
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = 1
+    try:
+        session = ort.InferenceSession(
+            str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+    except Exception as e:
+        logger.warning(f"Ignoring {onnx_path}, onnxruntime could not load it: {e}")
+        return None
+    exported_from = session.get_modelmeta().custom_metadata_map.get(PIPELINE_DIGEST_KEY)
+    if exported_from != pipeline_digest(pipeline_path):
+        return None
+    input_name = session.get_inputs()[0].name
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(FEATURES))
+        return session.run(["probabilities"], {input_name: X})[0][:, 1]
+
+    return predict
@@ -1,30 +1,55 @@
 import argparse
 import os
+import tempfile
 from pathlib import Path
 import json
 import mlflow
 import mlflow.sklearn
+import numpy as np
 import pandas as pd
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import (
+    train_test_split, GridSearchCV, HalvingGridSearchCV, ParameterGrid, StratifiedKFold
+)
 from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
 
-from src.data.preprocess import get_preprocessor, load_data
+from src.data.preprocess import CATEGORICAL_IDX, get_preprocessor, load_data
+from src.models.inference import PIPELINE_DIGEST_KEY, pipeline_digest
+
+# Successive halving keeps 1/HALVING_FACTOR of the forest candidates per round
+# and multiplies their n_estimators budget by the same factor; 2 divides both
+# the 100 (--fast) and 400 tree budgets evenly
+HALVING_FACTOR = 2
 
 
 def train_and_evaluate(X, y, fast: bool = False):
+    # Fit on a plain float matrix (FEATURES order) so the saved pipeline
+    # serves ndarrays directly without feature-name checks.
+    if isinstance(X, pd.DataFrame):
+        X = X.to_numpy(dtype=np.float64)
     preprocessor = get_preprocessor()
 
+    # The preprocessor has no searched hyperparameters, so cache its fitted
+    # state per CV fold instead of refitting it for every parameter combo.
+    # The cache lives in a temp dir removed after the searches (or by its
+    # finalizer if training fails), so it never builds up across runs.
+    project_dir = Path(__file__).parent.parent.parent
+    cache_dir = tempfile.TemporaryDirectory(prefix="sk_cache_")
+    memory = joblib.Memory(cache_dir.name, verbose=0)
+
     # Logistic Regression pipeline
     lr = LogisticRegression(max_iter=1000, n_jobs=None)
-    lr_pipe = Pipeline(steps=[("preprocessor", preprocessor), ("model", lr)])
+    lr_pipe = Pipeline(steps=[("preprocessor", preprocessor), ("model", lr)], memory=memory)
 
     # Random Forest pipeline
     rf = RandomForestClassifier(random_state=42)
-    rf_pipe = Pipeline(steps=[("preprocessor", preprocessor), ("model", rf)])
+    rf_pipe = Pipeline(steps=[("preprocessor", preprocessor), ("model", rf)], memory=memory)
 
     cv = StratifiedKFold(n_splits=3 if fast else 5, shuffle=True, random_state=42)
 
@@ -34,15 +59,25 @@ def train_and_evaluate(X, y, fast: bool = False):
         "model__solver": ["lbfgs"],
     }
 
+    # n_estimators is not searched: successive halving uses it as the budget,
+    # growing the forest only for the candidates that survive each round
     rf_param_grid = {
-        "model__n_estimators": [100] if fast else [100, 200, 400],
         "model__max_depth": [None, 5] if fast else [None, 5, 10],
         "model__min_samples_split": [2, 5],
     }
 
+    # Start small enough that the last halving round trains exactly rf_max_trees
+    # (the "exhaust" default floor-divides, e.g. ending on 99 instead of 100)
+    rf_max_trees = 100 if fast else 400
+    # HalvingGridSearchCV runs 1 + floor(log_factor(n_candidates)) rounds
+    rf_min_trees = rf_max_trees
+    n_candidates = len(ParameterGrid(rf_param_grid))
+    while n_candidates >= HALVING_FACTOR:
+        n_candidates //= HALVING_FACTOR
+        rf_min_trees //= HALVING_FACTOR
+
     # MLflow setup - use file-based backend for compatibility
-    mlflow_dir = Path(__file__).parent.parent.parent
-    mlflow_uri = str(mlflow_dir.resolve() / "mlruns")
+    mlflow_uri = str(project_dir.resolve() / "mlruns")
     mlflow.set_tracking_uri(mlflow_uri)
     mlflow.set_experiment("HeartDisease")
 
@@ -50,12 +85,19 @@ def train_and_evaluate(X, y, fast: bool = False):
     best_auc = -1.0
     best_estimator = None
 
-    for name, pipe, param_grid in [
-        ("LogisticRegression", lr_pipe, lr_param_grid),
-        ("RandomForest", rf_pipe, rf_param_grid),
-    ]:
+    searches = [
+        ("LogisticRegression", GridSearchCV(
+            lr_pipe, lr_param_grid, cv=cv, scoring="roc_auc", n_jobs=-1
+        )),
+        ("RandomForest", HalvingGridSearchCV(
+            rf_pipe, rf_param_grid, factor=HALVING_FACTOR, resource="model__n_estimators",
+            min_resources=rf_min_trees, max_resources=rf_max_trees,
+            cv=cv, scoring="roc_auc", n_jobs=-1,
+        )),
+    ]
+
+    for name, grid in searches:
         with mlflow.start_run(run_name=name):
-            grid = GridSearchCV(pipe, param_grid, cv=cv, scoring="roc_auc", n_jobs=-1)
             grid.fit(X, y)
             best = grid.best_estimator_
             # Predict proba on full dataset for a quick overall ROC-AUC
@@ -69,6 +111,8 @@ def train_and_evaluate(X, y, fast: bool = False):
             best.fit(X_train, y_train)
             y_pred = best.predict(X_test)
             y_test_proba = best.predict_proba(X_test)[:, 1]
+            # Don't ship the training cache location with the model
+            best.set_params(memory=None)
 
             metrics = {
                 "accuracy": float(accuracy_score(y_test, y_pred)),
@@ -83,11 +127,36 @@ def train_and_evaluate(X, y, fast: bool = False):
                 best_auc = auc
                 best_model_name = name
                 best_estimator = best
+    cache_dir.cleanup()
 
     return best_model_name, best_auc, best_estimator
 
 
-def save_best_model(best_estimator):
+# The ONNX graph computes in float32 (ai.onnx.ml Imputer/Scaler have no double
+# kernels), which can push rows across tree thresholds; only ship exports that
+# reproduce the pickle's labels and probabilities
+ONNX_ATOL = 1e-4
+ONNX_PROBE_ROWS = 20000
+
+
+def _onnx_matches_pipeline(onx, pipeline, X) -> bool:
+    import onnxruntime as ort
+
+    # Check the training rows plus random in-range inputs like the API accepts:
+    # uniform numeric values, categorical codes drawn from the observed ones
+    rng = np.random.default_rng(42)
+    probes = rng.uniform(np.nanmin(X, axis=0), np.nanmax(X, axis=0), size=(ONNX_PROBE_ROWS, X.shape[1]))
+    for j in CATEGORICAL_IDX:
+        codes = np.unique(X[:, j][~np.isnan(X[:, j])])
+        probes[:, j] = rng.choice(codes, size=ONNX_PROBE_ROWS)
+    X = np.vstack([X, probes])
+    session = ort.InferenceSession(onx.SerializeToString(), providers=["CPUExecutionProvider"])
+    onnx_proba = session.run(["probabilities"], {"input": X.astype(np.float32)})[0][:, 1]
+    proba = pipeline.predict_proba(X)[:, 1]
+    return bool(np.all((onnx_proba >= 0.5) == (proba >= 0.5)) and np.allclose(onnx_proba, proba, rtol=0, atol=ONNX_ATOL))
+
+
+def save_best_model(best_estimator, X):
     models_dir = Path("models")
     models_dir.mkdir(parents=True, exist_ok=True)
     out_path = models_dir / "model_pipeline.pkl"
@@ -99,7 +168,24 @@ def save_best_model(best_estimator):
     with open(schema_path, "w") as f:
         json.dump({"features": FEATURES}, f)
 
-    print(f"Saved best pipeline to {out_path}")
+    # ONNX copy of the same pipeline for onnxruntime serving (float32 input,
+    # probabilities as a plain tensor instead of a list of dicts), stamped with
+    # the pickle's digest so the apps can tell a stale export apart
+    onnx_path = models_dir / "model.onnx"
+    onx = convert_sklearn(
+        best_estimator,
+        initial_types=[("input", FloatTensorType([None, len(FEATURES)]))],
+        options={"zipmap": False},
+    )
+    if not _onnx_matches_pipeline(onx, best_estimator, np.asarray(X, dtype=np.float64)):
+        onnx_path.unlink(missing_ok=True)
+        print(f"Saved best pipeline to {out_path} (ONNX export skipped: float32 graph diverges from the pickle)")
+        return
+    meta = onx.metadata_props.add()
+    meta.key, meta.value = PIPELINE_DIGEST_KEY, pipeline_digest(out_path)
+    onnx_path.write_bytes(onx.SerializeToString())
+
+    print(f"Saved best pipeline to {out_path} (ONNX: {onnx_path})")
 
 
 def main():
@@ -111,7 +197,7 @@ def main():
     X, y = load_data(args.data)
     best_name, best_auc, best_estimator = train_and_evaluate(X, y, fast=args.fast)
     print(f"Best model: {best_name} (ROC-AUC={best_auc:.3f})")
-    save_best_model(best_estimator)
+    save_best_model(best_estimator, X)
 
 
 if __name__ == "__main__":
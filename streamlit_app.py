@@ -1,5 +1,7 @@
+import importlib.util
+
 import streamlit as st
-import requests
+import httpx
 import json
 
 # Page configuration
@@ -25,6 +27,7 @@ with st.sidebar:
         value="https://heart-api-production.up.railway.app",
         help="Enter the FastAPI backend URL"
     )
+    recheck_api = st.button("🔄 Recheck API", help="Health status is cached for 30 seconds")
     
     st.header("📋 Instructions")
     st.markdown("""
@@ -35,14 +38,44 @@ with st.sidebar:
     **Note:** This tool is for educational purposes only. Always consult a healthcare professional.
     """)
 
-# Check API health
+# Shared HTTP client: keep-alive connections (and HTTP/2 when `h2` is
+# installed) are reused across reruns instead of a new TCP+TLS handshake per call
+@st.cache_resource
+def get_client(url):
+    return httpx.Client(
+        base_url=url,
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=10,
+        limits=httpx.Limits(max_keepalive_connections=4),
+        headers={"Connection": "keep-alive"},
+    )
+
+# Check API health (cached so widget-triggered reruns don't each pay a round-trip)
+@st.cache_data(ttl=30, show_spinner=False)
 def check_api_health(url):
     try:
-        response = requests.get(f"{url}/health", timeout=2)
+        response = get_client(url).get("/health", timeout=2)
         return response.status_code == 200
     except:
         return False
 
+class PredictionError(Exception):
+    """Error message returned by the API in an otherwise successful response"""
+
+# Call the prediction endpoint; only successful results are cached (errors raise),
+# so resubmitting the same inputs doesn't hit the API again
+@st.cache_data(ttl=300, show_spinner=False)
+def get_prediction(url, payload):
+    response = get_client(url).post("/predict", json=payload)
+    response.raise_for_status()
+    result = response.json()
+    if "error" in result:
+        raise PredictionError(result["error"])
+    return result
+
+if recheck_api:
+    check_api_health.clear()
+
 # Main content area
 col1, col2 = st.columns([2, 1])
 
@@ -175,85 +208,77 @@ if submitted:
         
         # Call API
         with st.spinner("🔄 Processing..."):
-            response = requests.post(
-                f"{api_url}/predict",
-                json=input_payload,
-                timeout=10
-            )
+            result = get_prediction(api_url, input_payload)
         
-        if response.status_code == 200:
-            result = response.json()
+        prediction = result["prediction"]
+        probability = result["probability"]
+        
+        # Display results in right column
+        with col2:
+            st.subheader("🎯 Result")
             
-            if "error" in result:
-                st.error(f"❌ API Error: {result['error']}")
+            if prediction == 1:
+                st.error(f"⚠️ HIGH RISK")
+                risk_text = "High Risk of Heart Disease"
             else:
-                prediction = result["prediction"]
-                probability = result["probability"]
-                
-                # Display results in right column
-                with col2:
-                    st.subheader("🎯 Result")
-                    
-                    if prediction == 1:
-                        st.error(f"⚠️ HIGH RISK")
-                        risk_text = "High Risk of Heart Disease"
-                    else:
-                        st.success(f"✅ LOW RISK")
-                        risk_text = "Low Risk of Heart Disease"
-                    
-                    st.metric(
-                        label="Risk Assessment",
-                        value=risk_text
-                    )
-                    
-                    st.metric(
-                        label="Risk Probability",
-                        value=f"{probability*100:.1f}%"
-                    )
-                
-                # Display detailed results
-                st.divider()
-                st.subheader("📊 Detailed Analysis")
-                
-                results_col1, results_col2, results_col3 = st.columns(3)
-                
-                with results_col1:
-                    st.metric(
-                        "Prediction",
-                        "🔴 Disease Detected" if prediction == 1 else "🟢 No Disease"
-                    )
-                
-                with results_col2:
-                    st.metric(
-                        "Risk Score",
-                        f"{probability:.2%}"
-                    )
-                
-                with results_col3:
-                    confidence = max(probability, 1-probability)
-                    st.metric(
-                        "Confidence",
-                        f"{confidence:.2%}"
-                    )
-                
-                # Input summary
-                st.divider()
-                st.subheader("📝 Input Summary")
-                
-                summary_data = {
-                    "Parameter": list(input_payload.keys()),
-                    "Value": list(input_payload.values())
-                }
-                
-                import pandas as pd
-                summary_df = pd.DataFrame(summary_data)
-                st.table(summary_df)
-                
-        else:
-            st.error(f"❌ API Error: Status {response.status_code}")
-            st.write(response.text)
+                st.success(f"✅ LOW RISK")
+                risk_text = "Low Risk of Heart Disease"
+            
+            st.metric(
+                label="Risk Assessment",
+                value=risk_text
+            )
+            
+            st.metric(
+                label="Risk Probability",
+                value=f"{probability*100:.1f}%"
+            )
+        
+        # Display detailed results
+        st.divider()
+        st.subheader("📊 Detailed Analysis")
+        
+        results_col1, results_col2, results_col3 = st.columns(3)
+        
+        with results_col1:
+            st.metric(
+                "Prediction",
+                "🔴 Disease Detected" if prediction == 1 else "🟢 No Disease"
+            )
+        
+        with results_col2:
+            st.metric(
+                "Risk Score",
+                f"{probability:.2%}"
+            )
+        
+        with results_col3:
+            confidence = max(probability, 1-probability)
+            st.metric(
+                "Confidence",
+                f"{confidence:.2%}"
+            )
+        
+        # Input summary
+        st.divider()
+        st.subheader("📝 Input Summary")
+        
+        summary_data = {
+            "Parameter": list(input_payload.keys()),
+            "Value": list(input_payload.values())
+        }
+        
+        import pandas as pd
+        summary_df = pd.DataFrame(summary_data)
+        st.table(summary_df)
+        
+    except httpx.HTTPStatusError as e:
+        st.error(f"❌ API Error: Status {e.response.status_code}")
+        st.write(e.response.text)
+    except PredictionError as e:
+        st.error(f"❌ API Error: {e}")
         
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         st.error(f"❌ Cannot connect to API at {api_url}")
         st.info("Make sure the backend is running!")
     except Exception as e:
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api
+from app.api import RISK_LEVELS, HeartDiseaseInput, classify_risk, get_message, get_messages, get_risk_level
+
+
+def test_batch_messages_match_single_messages():
+    probs = np.array([0.0, 0.1234, np.nextafter(0.3, 0), 0.3, 0.5, np.nextafter(0.7, 0), 0.7, 0.9999, 1.0])
+    codes = classify_risk(probs)
+    assert [RISK_LEVELS[c] for c in codes] == [get_risk_level(p) for p in probs]
+
+    for preds in (np.zeros(len(probs), dtype=np.int8), (probs >= 0.5).astype(np.int8)):
+        expected = [get_message(int(pred), float(p)) for pred, p in zip(preds, probs)]
+        assert get_messages(preds, probs, codes) == expected
+
+
+def _payloads(n):
+    example = HeartDiseaseInput.model_config["json_schema_extra"]["example"]
+    return [{**example, "age": 30 + i, "chol": 180 + 7 * i, "oldpeak": round(0.1 * i, 1)} for i in range(n)]
+
+
+def _post_concurrently(client, payloads):
+    pool = ThreadPoolExecutor(max_workers=len(payloads))
+    try:
+        futures = [pool.submit(client.post, "/predict", json=p) for p in payloads]
+        # A future left unresolved by the batch worker times out here instead of hanging
+        return [f.result(timeout=10) for f in futures]
+    finally:
+        pool.shutdown(wait=False)
+
+
+def test_concurrent_predictions_batched_per_row(monkeypatch):
+    real_score = api.score
+    batch_sizes = []
+
+    def recording_score(X):
+        batch_sizes.append(len(X))
+        return real_score(X)
+
+    payloads = _payloads(16)
+    with TestClient(api.app) as client:
+        monkeypatch.setattr(api, "score", recording_score)
+        responses = _post_concurrently(client, payloads)
+
+    assert [r.status_code for r in responses] == [200] * len(payloads)
+    for payload, response in zip(payloads, responses):
+        expected = float(real_score(HeartDiseaseInput(**payload).as_row)[0])
+        assert response.json()["probability"] == pytest.approx(expected, abs=1e-12)
+    assert sum(batch_sizes) == len(payloads)
+
+
+def test_score_error_fails_every_request_in_batch(monkeypatch):
+    def failing_score(X):
+        raise RuntimeError("scoring failed")
+
+    payloads = _payloads(8)
+    with TestClient(api.app) as client:
+        monkeypatch.setattr(api, "score", failing_score)
+        responses = _post_concurrently(client, payloads)
+        assert [r.status_code for r in responses] == [500] * len(payloads)
+        assert all("scoring failed" in r.json()["detail"] for r in responses)
+
+        # The worker survives the failure and serves the next batch
+        monkeypatch.undo()
+        assert client.post("/predict", json=payloads[0]).status_code == 200
@@ -0,0 +1,67 @@
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.data.preprocess import get_preprocessor, load_data
+from src.models.inference import build_fast_predictor, build_onnx_predictor
+from src.models.train import save_best_model
+
+
+def _fit(model):
+    X, y = load_data("data/heart.csv")
+    pipe = Pipeline(steps=[("preprocessor", get_preprocessor()), ("model", model)])
+    pipe.fit(X.to_numpy(dtype=float), y)
+    return pipe, X.to_numpy(dtype=float)
+
+
+def test_fast_predictor_matches_logistic_regression():
+    pipe, X = _fit(LogisticRegression(max_iter=1000))
+    fast = build_fast_predictor(pipe)
+    assert fast is not None
+    # Include unseen categories and missing values
+    X = np.vstack([X, X[:1]])
+    X[-1, 2] = 9.0
+    X[0, 0] = np.nan
+    np.testing.assert_allclose(fast(X), pipe.predict_proba(X)[:, 1], rtol=1e-10)
+
+
+def test_fast_predictor_skips_random_forest():
+    pipe, _ = _fit(RandomForestClassifier(n_estimators=5, random_state=42))
+    assert build_fast_predictor(pipe) is None
+
+
+def test_onnx_predictor_matches_pipeline(tmp_path, monkeypatch):
+    pipe, X = _fit(LogisticRegression(max_iter=1000))
+    retrained, _ = _fit(LogisticRegression(C=0.01, max_iter=1000))
+    monkeypatch.chdir(tmp_path)
+    save_best_model(pipe, X)
+
+    onnx_path, pkl_path = tmp_path / "models" / "model.onnx", tmp_path / "models" / "model_pipeline.pkl"
+    onnx_predict = build_onnx_predictor(onnx_path, pkl_path)
+    assert onnx_predict is not None
+    np.testing.assert_allclose(onnx_predict(X), pipe.predict_proba(X)[:, 1], atol=1e-5)
+    assert build_onnx_predictor(tmp_path / "missing.onnx", pkl_path) is None
+
+    # Unloadable files are ignored rather than failing app startup
+    (tmp_path / "corrupt.onnx").write_bytes(b"not an onnx model")
+    assert build_onnx_predictor(tmp_path / "corrupt.onnx", pkl_path) is None
+
+    # A retrained pickle without a fresh export must not be served through the old graph
+    joblib.dump(retrained, pkl_path)
+    assert build_onnx_predictor(onnx_path, pkl_path) is None
+
+
+def test_onnx_export_skipped_when_float32_diverges(tmp_path, monkeypatch):
+    pipe, X = _fit(RandomForestClassifier(n_estimators=100, random_state=42))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "models").mkdir()
+    (tmp_path / "models" / "model.onnx").write_bytes(b"stale")
+    save_best_model(pipe, X)
+
+    # float32 preprocessing moves forest probabilities across tree thresholds,
+    # so no graph is written and the apps keep using predict_proba
+    assert (tmp_path / "models" / "model_pipeline.pkl").exists()
+    assert not (tmp_path / "models" / "model.onnx").exists()
+    assert build_onnx_predictor(tmp_path / "models" / "model.onnx", tmp_path / "models" / "model_pipeline.pkl") is None
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import main
+
+PAYLOAD = {
+    "age": 63, "sex": 1, "cp": 3, "trestbps": 145, "chol": 233, "fbs": 1, "restecg": 0,
+    "thalach": 150, "exang": 0, "oldpeak": 2.3, "slope": 0, "ca": 0, "thal": 1,
+}
+
+
+def _counts():
+    return (
+        REGISTRY.get_sample_value("prediction_cache_lookups_total"),
+        REGISTRY.get_sample_value("prediction_cache_misses_total"),
+    )
+
+
+def test_prediction_cache_hits_misses_and_eviction(monkeypatch):
+    monkeypatch.setattr(main, "CACHE_SIZE", 2)
+    main.PREDICTION_CACHE.clear()
+    client = TestClient(main.app)
+    lookups, misses = _counts()
+
+    first = client.post("/predict", json=PAYLOAD).json()
+    # oldpeak is keyed (and scored) at 1 decimal, so this is a cache hit
+    assert client.post("/predict", json={**PAYLOAD, "oldpeak": 2.34}).json() == first
+    assert _counts() == (lookups + 2, misses + 1)
+
+    client.post("/predict", json={**PAYLOAD, "age": 64})
+    client.post("/predict", json={**PAYLOAD, "age": 65})
+    assert len(main.PREDICTION_CACHE) == 2
+    assert _counts() == (lookups + 4, misses + 3)
+
+    # The least recently used entry (the first payload) was evicted; re-adding it
+    # pushes out age=64 while age=65 stays cached
+    client.post("/predict", json=PAYLOAD)
+    client.post("/predict", json={**PAYLOAD, "age": 65})
+    assert _counts() == (lookups + 6, misses + 4)
+
+
+def test_integral_fields_reject_fractions():
+    response = TestClient(main.app).post("/predict", json={**PAYLOAD, "age": 63.4})
+    assert response.status_code == 422
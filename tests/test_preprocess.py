@@ -1,4 +1,6 @@
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from src.data.preprocess import get_preprocessor, FEATURES
 
 
@@ -23,3 +25,27 @@ def test_preprocess_transform_shapes():
     Xt = pre.fit_transform(X)
     assert Xt.shape[0] == 3
     assert Xt.shape[1] > 10  # one-hot expands categorical features
+
+
+def test_preprocess_accepts_ndarray():
+    df = pd.DataFrame({
+        "age": [63, 67],
+        "sex": [1, 0],
+        "cp": [3, 2],
+        "trestbps": [145, 160],
+        "chol": [233, 286],
+        "fbs": [1, 0],
+        "restecg": [0, 1],
+        "thalach": [150, 108],
+        "exang": [0, 1],
+        "oldpeak": [2.3, 1.5],
+        "slope": [0, 2],
+        "ca": [0, 3],
+        "thal": [1, 2],
+    })
+    expected = get_preprocessor().fit_transform(df[FEATURES])
+    Xt = get_preprocessor().fit_transform(df[FEATURES].to_numpy(dtype=float))
+    assert Xt.shape == expected.shape
+    if sparse.issparse(expected):
+        expected, Xt = expected.toarray(), Xt.toarray()
+    np.testing.assert_allclose(Xt, expected)